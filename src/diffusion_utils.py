@@ -5,9 +5,62 @@ This module implements the diffusion scheduler that manages the noise schedule
 and handles adding noise to clean images during the forward diffusion process.
 """
 
+import functools
+from typing import NamedTuple
+
 import torch
 
 
+class _Schedule(NamedTuple):
+    """Precomputed noise schedule tables shared by ``DiffusionScheduler`` instances."""
+
+    betas: torch.Tensor
+    alphas: torch.Tensor
+    alphas_cumprod: torch.Tensor
+    sqrt_alphas_cumprod: torch.Tensor
+    sqrt_one_minus_alphas_cumprod: torch.Tensor
+
+
+@functools.lru_cache(maxsize=8)
+def _build_schedule(timesteps, beta_start, beta_end, device, dtype):
+    """
+    Build the linear beta schedule and the coefficients derived from it.
+
+    Cached per ``(timesteps, beta_start, beta_end, device, dtype)``, so creating
+    another scheduler with the same configuration (e.g. one per DataLoader worker)
+    reuses the existing tables. CPU tables are moved to shared memory so forked
+    worker processes see the same pages instead of copies.
+
+    The returned tensors are shared; treat them as read-only.
+    """
+    # 1. Define the linear beta schedule (the amount of noise added at each step)
+    # Built directly on the sampling device so add_noise never pays an H2D copy.
+    # The cumulative product is computed in at least float32 and only the final
+    # tables are cast, since a 1000-step cumprod in bfloat16/float16 drifts badly.
+    compute_dtype = torch.promote_types(dtype, torch.float32)
+    betas = torch.linspace(
+        beta_start, beta_end, timesteps, device=device, dtype=compute_dtype
+    )
+
+    # 2. Precalculate alphas and their cumulative products
+    alphas = 1.0 - betas
+    alphas_cumprod = torch.cumprod(alphas, axis=0)
+
+    # 3. Precalculate sqrt values for the reparameterization trick:
+    # x_t = sqrt(alpha_bar_t) * x_0 + sqrt(1 - alpha_bar_t) * epsilon
+    schedule = _Schedule(
+        betas=betas.to(dtype),
+        alphas=alphas.to(dtype),
+        alphas_cumprod=alphas_cumprod.to(dtype),
+        sqrt_alphas_cumprod=torch.sqrt(alphas_cumprod).to(dtype),
+        sqrt_one_minus_alphas_cumprod=torch.sqrt(1.0 - alphas_cumprod).to(dtype),
+    )
+    if device.type == "cpu":
+        for table in schedule:
+            table.share_memory_()
+    return schedule
+
+
 class DiffusionScheduler:
     """
     Manages the noise schedule for the diffusion process.
@@ -23,24 +76,56 @@ class DiffusionScheduler:
         alphas_cumprod (torch.Tensor): Cumulative product of alphas (ᾱ_t).
         sqrt_alphas_cumprod (torch.Tensor): √(ᾱ_t) for reparameterization.
         sqrt_one_minus_alphas_cumprod (torch.Tensor): √(1 - ᾱ_t) for reparameterization.
+
+    The tables are cached and shared between schedulers with the same arguments, so
+    they should not be modified in place.
+
+    Args:
+        timesteps (int, optional): Number of diffusion steps. Defaults to 1000.
+        beta_start (float, optional): First value of the linear beta schedule.
+        beta_end (float, optional): Last value of the linear beta schedule.
+        device (str or torch.device, optional): Device the schedule lives on. Should
+            match the device of the images passed to ``add_noise``. Defaults to "cpu".
+        dtype (torch.dtype, optional): Dtype of the stored schedule. Use torch.bfloat16
+            together with bfloat16 images to halve memory traffic in ``add_noise``.
+            Defaults to float32.
+        compile (bool, optional): Wrap ``add_noise`` with ``torch.compile`` so its ops are
+            fused into one kernel. Worth it for repeated calls with fixed shapes, e.g. in
+            a training loop; the first call pays the compilation cost. With CUDA graphs the
+            returned tensors may be overwritten by the next call, so clone them if they
+            need to outlive it. Ignored on torch < 2.0. Defaults to False.
     """
 
-    def __init__(self, timesteps=1000, beta_start=1e-4, beta_end=0.02):
+    def __init__(
+        self,
+        timesteps=1000,
+        beta_start=1e-4,
+        beta_end=0.02,
+        device="cpu",
+        dtype=torch.float32,
+        compile=False,
+    ):
         self.timesteps = timesteps
 
-        # 1. Define the linear beta schedule (the amount of noise added at each step)
-        self.betas = torch.linspace(beta_start, beta_end, timesteps)
-
-        # 2. Precalculate alphas and their cumulative products
-        self.alphas = 1.0 - self.betas
-        self.alphas_cumprod = torch.cumprod(self.alphas, axis=0)
-
-        # 3. Precalculate sqrt values for the reparameterization trick:
-        # x_t = sqrt(alpha_bar_t) * x_0 + sqrt(1 - alpha_bar_t) * epsilon
-        self.sqrt_alphas_cumprod = torch.sqrt(self.alphas_cumprod)
-        self.sqrt_one_minus_alphas_cumprod = torch.sqrt(1.0 - self.alphas_cumprod)
-
-    def add_noise(self, x_start, t):
+        # Schedule tables are built once per configuration and shared between instances
+        schedule = _build_schedule(
+            timesteps, beta_start, beta_end, torch.device(device), dtype
+        )
+        self.betas = schedule.betas
+        self.alphas = schedule.alphas
+        self.alphas_cumprod = schedule.alphas_cumprod
+        self.sqrt_alphas_cumprod = schedule.sqrt_alphas_cumprod
+        self.sqrt_one_minus_alphas_cumprod = schedule.sqrt_one_minus_alphas_cumprod
+
+        # Optionally JIT-fuse the add_noise body into a single kernel (torch >= 2.0)
+        if compile and hasattr(torch, "compile"):
+            self._add_noise_fn = torch.compile(
+                self._add_noise_impl, mode="reduce-overhead", dynamic=False
+            )
+        else:
+            self._add_noise_fn = self._add_noise_impl
+
+    def add_noise(self, x_start, t, noise_buf=None, generator=None):
         """
         Forward process: Adds Gaussian noise to a clean image at a specific timestep.
 
@@ -54,26 +139,102 @@ class DiffusionScheduler:
             - ε is random Gaussian noise
 
         Args:
-            x_start (torch.Tensor): Clean image tensor (x_0). Shape: (batch_size, channels, height, width).
-            t (torch.Tensor): Timestep indices (0 to T-1). Shape: (batch_size,).
+            x_start (torch.Tensor): Clean image tensor (x_0). Shape: (batch_size, channels, height, width)
+                or (batch_size, height, width).
+            t (torch.Tensor or int): Timestep indices (0 to T-1). Shape: (batch_size,),
+                or a single timestep applied to the whole batch.
+            noise_buf (torch.Tensor, optional): Preallocated buffer, same shape/dtype/device
+                as x_start, that is filled in place with the noise. Reuse it across steps
+                in a training loop to avoid a fresh allocation per call. Defaults to None.
+            generator (torch.Generator, optional): RNG on x_start's device used to draw
+                the noise. Defaults to the global generator.
 
         Returns:
             tuple:
                 - x_noisy (torch.Tensor): Noised image at timestep t. Same shape as x_start.
                 - noise (torch.Tensor): The Gaussian noise that was added. Same shape as x_start.
+                  This is ``noise_buf`` when one is given, so it is overwritten on the next call.
         """
-        noise = torch.randn_like(x_start)
+        return self._add_noise_fn(x_start, t, noise_buf, generator)
 
-        # Extract and reshape noise schedule coefficients for broadcasting
-        # View as (batch_size, 1, 1) to broadcast across spatial dimensions
-        sqrt_alpha_cumprod_t = self.sqrt_alphas_cumprod[t].view(-1, 1, 1)
-        sqrt_one_minus_alpha_cumprod_t = self.sqrt_one_minus_alphas_cumprod[t].view(
-            -1, 1, 1
+    def _add_noise_impl(self, x_start, t, noise_buf, generator):
+        """Body of ``add_noise``; kept separate so it can be wrapped by torch.compile."""
+        if noise_buf is None:
+            noise_buf = torch.empty_like(x_start)
+        noise = noise_buf.normal_(generator=generator)
+
+        sqrt_alpha_cumprod_t, sqrt_one_minus_alpha_cumprod_t = self._coeffs(
+            t, x_start.ndim, x_start.dtype
         )
 
         # Apply reparameterization: mix original signal with noise
-        x_noisy = (
-            sqrt_alpha_cumprod_t * x_start + sqrt_one_minus_alpha_cumprod_t * noise
+        # Fused as (√(1 - ᾱ_t) * ε) + √(ᾱ_t) * x_0 into a single output buffer,
+        # avoiding a second full-size intermediate on this memory-bound path
+        x_noisy = torch.mul(noise, sqrt_one_minus_alpha_cumprod_t)
+        x_noisy.addcmul_(sqrt_alpha_cumprod_t, x_start)
+
+        return x_noisy, noise
+
+    def add_noise_batched(self, x_start, t_vec, noise_buf=None, generator=None):
+        """
+        Forward process for several timesteps at once.
+
+        Produces a noisy version of ``x_start`` for every timestep in ``t_vec`` with a
+        single RNG call and one fused multiply-add, instead of calling ``add_noise``
+        once per timestep.
+
+        Args:
+            x_start (torch.Tensor): Clean image tensor (x_0). Shape: (batch_size, ...).
+            t_vec (torch.Tensor or int): Timestep indices (0 to T-1). Shape: (K,); a
+                single timestep is treated as K=1.
+            noise_buf (torch.Tensor, optional): Preallocated buffer of shape
+                (K, batch_size, ...), same dtype/device as x_start, that is filled in
+                place with the noise. Defaults to None.
+            generator (torch.Generator, optional): RNG on x_start's device used to draw
+                the noise. Defaults to the global generator.
+
+        Returns:
+            tuple:
+                - x_noisy (torch.Tensor): Noised images. Shape: (K, batch_size, ...).
+                - noise (torch.Tensor): The Gaussian noise that was added. Same shape as x_noisy.
+                  This is ``noise_buf`` when one is given, so it is overwritten on the next call.
+        """
+        t_vec = torch.as_tensor(t_vec).reshape(-1)
+        if noise_buf is None:
+            noise_buf = torch.empty(
+                (t_vec.shape[0],) + x_start.shape,
+                device=x_start.device,
+                dtype=x_start.dtype,
+            )
+        noise = noise_buf.normal_(generator=generator)
+
+        # One coefficient per timestep, broadcast over the batch and spatial dims
+        sqrt_alpha_cumprod_t, sqrt_one_minus_alpha_cumprod_t = self._coeffs(
+            t_vec, x_start.ndim + 1, x_start.dtype
         )
 
+        # Same fused reparameterization as add_noise, broadcast over the timestep axis
+        x_noisy = torch.mul(noise, sqrt_one_minus_alpha_cumprod_t)
+        x_noisy.addcmul_(sqrt_alpha_cumprod_t, x_start.unsqueeze(0))
+
         return x_noisy, noise
+
+    def _coeffs(self, t, ndim, dtype):
+        """
+        Look up √(ᾱ_t) and √(1 - ᾱ_t) for timesteps ``t``, ready for broadcasting.
+
+        Both are cast to ``dtype`` and viewed as (len(t), 1, ..., 1) with ``ndim``
+        dimensions, so each entry of the leading axis gets its own coefficient
+        regardless of whether the images are (B, H, W) or (B, C, H, W). ``t`` may be
+        an int, a 0-d tensor or a 1-D tensor; a single timestep broadcasts over the
+        whole batch.
+        """
+        t = torch.as_tensor(t, device=self.sqrt_alphas_cumprod.device).reshape(-1)
+        shape = (t.shape[0],) + (1,) * (ndim - 1)
+        sqrt_alpha_cumprod_t = (
+            self.sqrt_alphas_cumprod.index_select(0, t).to(dtype).view(shape)
+        )
+        sqrt_one_minus_alpha_cumprod_t = (
+            self.sqrt_one_minus_alphas_cumprod.index_select(0, t).to(dtype).view(shape)
+        )
+        return sqrt_alpha_cumprod_t, sqrt_one_minus_alpha_cumprod_t
@@ -0,0 +1,63 @@
+"""
+Numba CPU kernels for the k-space reconstruction path.
+
+On CPU-only machines the masking and magnitude steps of ``loader.reconstruct``
+operate on a few hundred KB per slice, so they are dominated by per-op dispatch
+overhead rather than arithmetic. These kernels do each step in a single parallel
+pass over the rows. Complex arrays are passed in their interleaved
+(height, width, 2) real/imaginary layout, i.e. ``torch.view_as_real(x).numpy()``.
+
+Numba is an optional dependency; this module is only imported when
+``backend="numba"`` is requested.
+"""
+
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, fastmath=True, cache=True)
+def fused_mask_copy(kspace, boxes, out_masked):
+    """
+    Copy k-space into ``out_masked`` while zeroing a set of rectangular regions.
+
+    Each row of ``boxes`` is ``(lo_h, hi_h, lo_w, hi_w)`` and zeroes rows
+    ``lo_h:hi_h`` and columns ``lo_w:hi_w``. Bounds must already be resolved to
+    non-negative indices, e.g. with ``slice.indices``.
+
+    Args:
+        kspace (np.ndarray): float32 array of shape (height, width, 2).
+        boxes (np.ndarray): int64 array of shape (num_boxes, 4).
+        out_masked (np.ndarray): Output array with the same shape as ``kspace``.
+    """
+    h, w, _ = kspace.shape
+    num_boxes = boxes.shape[0]
+    for i in numba.prange(h):
+        for j in range(w):
+            zero = False
+            for b in range(num_boxes):
+                if boxes[b, 0] <= i < boxes[b, 1] and boxes[b, 2] <= j < boxes[b, 3]:
+                    zero = True
+                    break
+            if zero:
+                out_masked[i, j, 0] = 0.0
+                out_masked[i, j, 1] = 0.0
+            else:
+                out_masked[i, j, 0] = kspace[i, j, 0]
+                out_masked[i, j, 1] = kspace[i, j, 1]
+
+
+@numba.njit(parallel=True, fastmath=True, cache=True)
+def complex_abs(x, out):
+    """
+    Magnitude of a (height, width, 2) complex array, written into ``out``.
+
+    Args:
+        x (np.ndarray): float32 array of shape (height, width, 2).
+        out (np.ndarray): float32 array of shape (height, width).
+    """
+    h, w, _ = x.shape
+    for i in numba.prange(h):
+        for j in range(w):
+            re = x[i, j, 0]
+            im = x[i, j, 1]
+            out[i, j] = np.sqrt(re * re + im * im)
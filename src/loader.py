@@ -1,16 +1,123 @@
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import h5py
+import numpy as np
 import torch
-import fastmri
-from fastmri.data import transforms as T
 
 
-def load_and_reconstruct(file_path, mask_type=None):
-    """Load and reconstruct an MRI slice from k-space stored in an HDF5 file.
+@functools.lru_cache(maxsize=32)
+def mask_regions(h, w, mask_type):
+    """Return the (row, column) regions of k-space zeroed by a mask.
+
+    Masks are applied by zeroing these regions of a copy of k-space (see
+    ``reconstruct``); the same regions can be used to mask anything laid out
+    on the k-space grid, e.g. a precomputed log-magnitude. Results are cached
+    per ``(h, w, mask_type)`` since the geometry is fixed across a dataset.
+
+    Args:
+        h (int): Height of the k-space slice.
+        w (int): Width of the k-space slice.
+        mask_type (str or None): One of {None, 'low_pass', 'high_pass'}.
+
+    Returns:
+        tuple: Tuples of ``(row_slice, col_slice)`` to zero. Empty for ``None``.
+    """
+    if mask_type == "low_pass":
+        # Keep only a tiny 10% center to really see the blur
+        return (
+            (slice(None, h // 2 - 16), slice(None)),
+            (slice(h // 2 + 16, None), slice(None)),
+            (slice(h // 2 - 16, h // 2 + 16), slice(None, w // 2 - 16)),
+            (slice(h // 2 - 16, h // 2 + 16), slice(w // 2 + 16, None)),
+        )
+    if mask_type == "high_pass":
+        return ((slice(h // 2 - 32, h // 2 + 32), slice(w // 2 - 32, w // 2 + 32)),)
+    return ()
+
+
+def load_slice(file_path):
+    """Load the middle k-space slice of an HDF5 volume as a PyTorch tensor.
+
+    Only the middle slice is read from disk, so the rest of the volume is
+    never decompressed.
+
+    Args:
+        file_path (str): Path to the HDF5 file containing k-space data under the
+            key "kspace". Expected shape is (slices, height, width) for single-coil.
+
+    Returns:
+        torch.Tensor: Complex64 k-space of the middle slice, shape (height, width).
+
+    Raises:
+        FileNotFoundError: If the specified HDF5 file does not exist.
+        KeyError: If the HDF5 file does not contain a "kspace" dataset.
+    """
+    with h5py.File(file_path, "r") as hf:
+        kspace = hf["kspace"]
+        slice_kspace = kspace[kspace.shape[0] // 2]
+    return torch.from_numpy(slice_kspace).to(torch.complex64)
+
+
+def _read_middle_slice(file_path):
+    """Load the middle slice, pinned when CUDA is available for non_blocking H2D copies."""
+    slice_kspace_tensor = load_slice(file_path)
+    if torch.cuda.is_available():
+        slice_kspace_tensor = slice_kspace_tensor.pin_memory()
+    return slice_kspace_tensor
+
+
+def iter_slices(file_paths, prefetch=4):
+    """Yield the middle k-space slice of each file, reading ahead in the background.
+
+    Up to ``prefetch`` files are read concurrently in worker threads while the
+    caller processes earlier slices, so HDF5 reads and decompression overlap
+    with reconstruction instead of blocking it. Slices are yielded in the order
+    of ``file_paths``.
+
+    Args:
+        file_paths (iterable): Paths to HDF5 files, as accepted by ``load_slice``.
+        prefetch (int, optional): Number of files to read ahead. Defaults to 4.
+
+    Yields:
+        torch.Tensor: Complex64 k-space of the middle slice of each file, in
+        pinned memory when CUDA is available. ``reconstruct`` keeps masked
+        copies pinned too, so their host-to-device copy is asynchronous.
+
+    Raises:
+        FileNotFoundError: If one of the files does not exist.
+        KeyError: If a file does not contain a "kspace" dataset.
+    """
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        pending = deque()
+        for file_path in file_paths:
+            pending.append(executor.submit(_read_middle_slice, file_path))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def reconstruct(slice_kspace_tensor, mask_type=None, backend="torch", real_fft=False):
+    """Reconstruct an image from a k-space slice, optionally masking it first.
+
+    Applies a frequency-domain mask, performs an inverse 2D FFT to obtain the
+    image, and computes the magnitude. The FFT runs on CUDA when available;
+    the returned tensors are always on the CPU.
 
-    The function loads a k-space dataset named "kspace" from the given HDF5
-    file, selects the middle slice of the volume, converts it to a PyTorch
-    tensor, optionally applies a frequency-domain mask, performs an inverse
-    2D FFT to obtain the image, and computes the magnitude.
+    With ``backend='numba'`` the masking and magnitude steps run as parallel
+    Numba kernels (see ``kernels_nb``) and the FFT stays on the CPU. This is
+    meant for CPU-only machines, where those steps are dominated by torch
+    dispatch overhead. Requires ``numba`` to be installed.
+
+    With ``real_fft=True`` the caller asserts that the input k-space is
+    Hermitian-symmetric, i.e. the image is real, and the image is computed with
+    the half-size ``irfft2`` instead of a full complex IFFT. Symmetry is not
+    checked, so this is only valid for k-space synthesized from a real image;
+    measured MRI k-space carries phase. It is only supported for the torch
+    backend and ``mask_type=None``: the low/high-pass boxes span frequencies
+    ``-n..n-1`` and so break the symmetry of their input.
 
     Mask behavior (controlled by ``mask_type``):
         - ``None`` (default): no masking, use full k-space.
@@ -18,11 +125,118 @@ def load_and_reconstruct(file_path, mask_type=None):
           ``h//2-16:h//2+16`` and ``w//2-16:w//2+16``) and zero the rest.
         - ``'high_pass'``: zero the central third of k-space and keep the edges.
 
+    Args:
+        slice_kspace_tensor (torch.Tensor): Complex k-space slice of shape
+            (height, width), as returned by ``load_slice``. Not modified.
+        mask_type (str or None, optional): Type of mask to apply; one of
+            {None, 'low_pass', 'high_pass'}. Defaults to ``None``.
+        backend (str, optional): Either ``'torch'`` or ``'numba'``. Defaults to
+            ``'torch'``.
+        real_fft (bool, optional): Treat the k-space as Hermitian-symmetric and
+            use ``irfft2``. Requires ``backend='torch'`` and ``mask_type=None``.
+            Defaults to ``False``.
+
+    Returns:
+        tuple: A tuple containing:
+            - image_abs (torch.Tensor): Magnitude of the reconstructed image.
+            - masked_kspace (torch.Tensor): The masked k-space tensor.
+
+    Raises:
+        ValueError: If ``backend`` is not one of {'torch', 'numba'}, or if
+            ``real_fft=True`` is combined with the numba backend or a mask.
+    """
+    if real_fft and backend != "torch":
+        raise ValueError("real_fft=True is only supported by the torch backend")
+    if real_fft and mask_type is not None:
+        raise ValueError(
+            f"real_fft=True cannot be used with mask_type={mask_type!r}: "
+            "the mask breaks the Hermitian symmetry of k-space"
+        )
+    if backend == "numba":
+        return _reconstruct_numba(slice_kspace_tensor, mask_type)
+    if backend != "torch":
+        raise ValueError(f"Unknown backend: {backend!r}")
+
+    h, w = slice_kspace_tensor.shape
+    # Apply the mask by zeroing regions of a copy rather than multiplying
+    # against a mostly-zero/mostly-one mask tensor
+    regions = mask_regions(h, w, mask_type)
+    if regions:
+        # Keep the copy pinned if the input is (see iter_slices) so the
+        # non_blocking device copy below stays asynchronous
+        masked_kspace = torch.empty_like(
+            slice_kspace_tensor, pin_memory=slice_kspace_tensor.is_pinned()
+        ).copy_(slice_kspace_tensor)
+        for region in regions:
+            masked_kspace[region].zero_()
+    else:
+        masked_kspace = slice_kspace_tensor
+
+    # Centered IFFT (same as fastmri.ifft2c) on native complex tensors, on the
+    # GPU when one is available
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    kc = torch.fft.ifftshift(masked_kspace.to(device, non_blocking=True), dim=(-2, -1))
+    if real_fft:
+        # The image is real, so only the non-redundant half of k-space is needed
+        image = torch.fft.irfft2(kc[..., : w // 2 + 1], s=(h, w), norm="ortho")
+    else:
+        image = torch.fft.ifft2(kc, norm="ortho")
+    image = torch.fft.fftshift(image, dim=(-2, -1))
+    image_abs = image.abs().cpu()
+
+    return image_abs, masked_kspace
+
+
+def _reconstruct_numba(slice_kspace_tensor, mask_type):
+    """CPU implementation of ``reconstruct`` using the Numba kernels."""
+    try:
+        import kernels_nb
+    except ImportError as err:
+        raise ImportError(
+            "backend='numba' requires numba; install it with `pip install numba`"
+        ) from err
+
+    # The kernels work on the interleaved (h, w, 2) float view of complex k-space
+    kspace = torch.view_as_real(slice_kspace_tensor.contiguous()).numpy()
+    h, w, _ = kspace.shape
+
+    regions = mask_regions(h, w, mask_type)
+    if regions:
+        # Resolve the slices exactly as torch indexing does (negative bounds wrap)
+        boxes = np.array(
+            [rows.indices(h)[:2] + cols.indices(w)[:2] for rows, cols in regions],
+            dtype=np.int64,
+        )
+        masked = np.empty_like(kspace)
+        kernels_nb.fused_mask_copy(kspace, boxes, masked)
+    else:
+        masked = kspace
+    masked_kspace = torch.view_as_complex(torch.from_numpy(masked))
+
+    image = torch.fft.fftshift(
+        torch.fft.ifft2(torch.fft.ifftshift(masked_kspace, dim=(-2, -1)), norm="ortho"),
+        dim=(-2, -1),
+    )
+    image_abs = np.empty((h, w), dtype=masked.dtype)
+    kernels_nb.complex_abs(torch.view_as_real(image).contiguous().numpy(), image_abs)
+
+    return torch.from_numpy(image_abs), masked_kspace
+
+
+def load_and_reconstruct(file_path, mask_type=None, backend="torch"):
+    """Load and reconstruct an MRI slice from k-space stored in an HDF5 file.
+
+    Convenience wrapper around ``load_slice`` followed by ``reconstruct``.
+    When reconstructing the same file with several masks, call ``load_slice``
+    once and ``reconstruct`` per mask instead.
+
     Args:
         file_path (str): Path to the HDF5 file containing k-space data under the
             key "kspace". Expected shape is (slices, height, width) for single-coil.
         mask_type (str or None, optional): Type of mask to apply; one of
             {None, 'low_pass', 'high_pass'}. Defaults to ``None``.
+        backend (str, optional): Either ``'torch'`` or ``'numba'``; see
+            ``reconstruct``. Defaults to ``'torch'``.
 
     Returns:
         tuple: A tuple containing:
@@ -32,29 +246,28 @@ def load_and_reconstruct(file_path, mask_type=None):
     Raises:
         FileNotFoundError: If the specified HDF5 file does not exist.
         KeyError: If the HDF5 file does not contain a "kspace" dataset.
+        ValueError: If ``backend`` is not one of {'torch', 'numba'}.
     """
+    return reconstruct(load_slice(file_path), mask_type=mask_type, backend=backend)
 
-    hf = h5py.File(file_path, "r")
-    kspace = hf["kspace"][()]
-    slice_kspace = kspace[kspace.shape[0] // 2]
-    slice_kspace_tensor = T.to_tensor(slice_kspace)
 
-    h, w, _ = slice_kspace_tensor.shape
+def log_kspace_mag(kspace):
+    """Compute the log-magnitude of a k-space tensor for display.
 
-    # Create the mask
-    if mask_type == "low_pass":
-        mask = torch.zeros((h, w, 1))
-        # Keep only a tiny 10% center to really see the blur
-        mask[h // 2 - 16 : h // 2 + 16, w // 2 - 16 : w // 2 + 16, :] = 1
-    elif mask_type == "high_pass":
-        mask = torch.ones((h, w, 1))
-        mask[h // 2 - 32 : h // 2 + 32, w // 2 - 32 : w // 2 + 32, :] = 0
-    else:
-        mask = torch.ones((h, w, 1))
+    Equivalent to ``log(kspace.abs())`` but fuses the square root into the
+    log (``log|k| = 0.5 * log(re² + im²)``), so the magnitude is computed in a
+    single buffer without a separate ``sqrt`` pass.
 
-    # Apply mask and IFFT
-    masked_kspace = slice_kspace_tensor * mask
-    image = fastmri.ifft2c(masked_kspace)
-    image_abs = fastmri.complex_abs(image)
+    Args:
+        kspace (torch.Tensor): Complex k-space tensor of shape (...), or a real
+            tensor with real/imaginary parts in the last dimension, shape (..., 2).
 
-    return image_abs, masked_kspace
+    Returns:
+        torch.Tensor: Log-magnitude of shape (...). Zero entries are clamped to
+        ``log(1e-9)`` to avoid ``-inf``.
+    """
+    if kspace.is_complex():
+        re, im = kspace.real, kspace.imag
+    else:
+        re, im = kspace[..., 0], kspace[..., 1]
+    return 0.5 * torch.log(re.mul(re).addcmul_(im, im).clamp_min_(1e-18))
@@ -0,0 +1,50 @@
+import torch
+from loader import reconstruct
+
+
+def test_numba_matches_torch():
+    # Small slices make the high-pass box bounds go negative, which torch
+    # indexing wraps around; the Numba backend must mask the same regions
+    torch.manual_seed(0)
+    for h, w in [(64, 48), (63, 47), (640, 368)]:
+        kspace = torch.randn(h, w, dtype=torch.complex64)
+        for mask_type in [None, "low_pass", "high_pass"]:
+            img_torch, k_torch = reconstruct(kspace, mask_type, backend="torch")
+            img_numba, k_numba = reconstruct(kspace, mask_type, backend="numba")
+            torch.testing.assert_close(k_numba, k_torch, rtol=0, atol=0)
+            torch.testing.assert_close(img_numba, img_torch)
+
+
+def _expect_value_error(fn):
+    try:
+        fn()
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+def test_real_fft_matches_complex_ifft():
+    # k-space of a real image is Hermitian-symmetric, so irfft2 must reproduce
+    # the full IFFT; the masks break that symmetry and must be rejected
+    torch.manual_seed(0)
+    for h, w in [(640, 368), (63, 47)]:
+        image = torch.rand(h, w)
+        kspace = torch.fft.fftshift(
+            torch.fft.fft2(torch.fft.ifftshift(image), norm="ortho")
+        ).to(torch.complex64)
+        for mask_type in [None, "low_pass", "high_pass"]:
+            if mask_type is None:
+                img_real, _ = reconstruct(kspace, mask_type, real_fft=True)
+                img_full, _ = reconstruct(kspace, mask_type)
+                torch.testing.assert_close(img_real, img_full)
+            else:
+                _expect_value_error(
+                    lambda: reconstruct(kspace, mask_type, real_fft=True)
+                )
+        _expect_value_error(lambda: reconstruct(kspace, backend="numba", real_fft=True))
+
+
+if __name__ == "__main__":
+    test_numba_matches_torch()
+    test_real_fft_matches_complex_ifft()
+    print("Reconstruction backends match.")
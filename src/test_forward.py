@@ -1,5 +1,6 @@
 import torch
 import matplotlib.pyplot as plt
+from torchvision.utils import make_grid
 from loader import load_and_reconstruct
 from diffusion_utils import DiffusionScheduler
 
@@ -11,24 +12,47 @@ def test_diffusion_on_knee(file_path):
 
     # Standardize: Diffusion models work best with normalized data
     # Let's scale it to roughly [-1, 1] or [0, 1]
-    x_0 = image_abs / torch.max(image_abs)
+    # Use bfloat16 on GPUs that support it to halve bandwidth in add_noise;
+    # CPUs generally lack fast bf16 arithmetic, so stay in float32 there
+    if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+        device, dtype = torch.device("cuda"), torch.bfloat16
+    else:
+        device, dtype = torch.device("cpu"), torch.float32
+    x_0 = (image_abs / image_abs.amax()).to(device=device, dtype=dtype)
     x_0 = x_0.unsqueeze(0)  # Add batch dimension [1, H, W]
 
     # 2. Initialize Scheduler
-    scheduler = DiffusionScheduler(timesteps=1000)
+    scheduler = DiffusionScheduler(timesteps=1000, device=x_0.device, dtype=x_0.dtype)
 
     # 3. Sample at different stages of "destruction"
     test_steps = [0, 50, 150, 400, 999]
-    fig, axes = plt.subplots(1, len(test_steps), figsize=(20, 5))
 
-    for i, t_val in enumerate(test_steps):
-        t = torch.tensor([t_val])
-        x_t, _ = scheduler.add_noise(x_0, t)
+    # Noise all timesteps in one call: shape [K, 1, H, W]
+    x_ts, _ = scheduler.add_noise_batched(x_0, torch.tensor(test_steps))
+
+    # Composite all panels into one image so there is a single D2H copy and render
+    padding = 2
+    grid = make_grid(
+        x_ts.float(),
+        nrow=len(test_steps),
+        padding=padding,
+        normalize=True,
+        scale_each=True,
+    )
+    grid = grid[0].cpu().numpy()  # make_grid repeats grayscale to 3 channels
 
-        # Display
-        axes[i].imshow(x_t.squeeze().numpy(), cmap="gray")
-        axes[i].set_title(f"Step t={t_val}")
-        axes[i].axis("off")
+    plt.figure(figsize=(20, 5))
+    plt.imshow(grid, cmap="gray")
+    panel_width = x_ts.shape[-1] + padding
+    for i, t_val in enumerate(test_steps):
+        plt.text(
+            padding + i * panel_width + x_ts.shape[-1] / 2,
+            -padding,
+            f"Step t={t_val}",
+            ha="center",
+            va="bottom",
+        )
+    plt.axis("off")
 
     plt.tight_layout()
     plt.show()
@@ -1,10 +1,17 @@
+import math
 from pathlib import Path
 
-import fastmri
 import matplotlib.pyplot as plt
 import torch
 
-from loader import load_and_reconstruct
+from loader import load_slice, log_kspace_mag, mask_regions, reconstruct
+
+
+def _to_u8(t):
+    """Min-max scale a tensor to a uint8 array so imshow can skip its own normalization."""
+    t = t.detach()
+    mn, mx = t.amin(), t.amax()
+    return ((t - mn) * (255.0 / (mx - mn).clamp_min(1e-9))).to(torch.uint8).numpy()
 
 
 def create_comprehensive_plot(file_path):
@@ -29,11 +36,12 @@ def create_comprehensive_plot(file_path):
           visualization of dynamic range.
         - The output directory is determined relative to the script location
           (parent.parent / "outputs").
-        - Requires the load_and_reconstruct function to be available.
+        - The slice is loaded once with load_slice and reconstructed per mode; the
+          log k-space is computed once and masked per mode.
 
     Raises:
         FileNotFoundError: If the specified file_path does not exist.
-        Exception: If load_and_reconstruct fails to process the file.
+        Exception: If load_slice fails to process the file.
     """
     root_dir = Path(__file__).resolve().parent.parent
     output_dir = root_dir / "outputs"
@@ -41,17 +49,27 @@ def create_comprehensive_plot(file_path):
     modes = [None, "low_pass", "high_pass"]
     fig, axes = plt.subplots(2, 3, figsize=(15, 10))
 
+    # Read the slice once; only the mask and IFFT differ between modes
+    slice_kspace_tensor = load_slice(file_path)
+    h, w = slice_kspace_tensor.shape
+
+    # The log-magnitude of masked k-space is the unmasked one with the masked
+    # regions set to the log floor, so compute the sqrt/log pass only once
+    logk_full = log_kspace_mag(slice_kspace_tensor)
+    log_floor = math.log(1e-9)
+
     for i, mode in enumerate(modes):
-        img_abs, kspace_tensor = load_and_reconstruct(file_path, mask_type=mode)
+        img_abs, _ = reconstruct(slice_kspace_tensor, mask_type=mode)
 
         # --- Top Row: K-Space (Log Scale) ---
-        k_mag = torch.log(
-            fastmri.complex_abs(kspace_tensor) + 1e-9
-        ).numpy()  # Add small value to avoid log(0)
-        axes[0, i].imshow(k_mag, cmap="gray")
+        regions = mask_regions(h, w, mode)
+        logk = logk_full.clone() if regions else logk_full
+        for region in regions:
+            logk[region] = log_floor
+        axes[0, i].imshow(_to_u8(logk), cmap="gray", vmin=0, vmax=255)
         axes[0, i].set_title(f"K-Space: {mode}")
         axes[0, i].axis("off")
-        axes[1, i].imshow(img_abs, cmap="gray")
+        axes[1, i].imshow(_to_u8(img_abs), cmap="gray", vmin=0, vmax=255)
         axes[1, i].set_title(f"Image: {mode}")
         axes[1, i].axis("off")
 